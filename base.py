@@ -1,10 +1,15 @@
 # base.py
 
-from typing import List, Tuple, Set, Union
+from typing import List, Tuple, Set, Union, Optional, Callable
+from collections import OrderedDict, Counter
 from jieba import analyse
 import yaml
 import os
 import logging
+import hashlib
+import queue
+import threading
+import time
 
 
 class HanSegBase:
@@ -80,36 +85,56 @@ class HanSegBase:
                 return analyse.textrank(processed_text, topK=limit, withWeight=with_weight, allowPOS=self.allowPOS)
         raise HanSegError(f"Multi-engine mode is disabled and {self.engine_name} does not support keywords extract.")
 
-    def cut_file(self, input_path: str, output_path: str, batch_size: int = 1000) -> None:
-        with open(input_path, 'r', encoding='utf-8') as f_in, \
-            open(output_path, 'w', encoding='utf-8') as f_out:
-            batch = []
-            for line in f_in:
-                stripped_line = line.strip()
-                if stripped_line:
-                    batch.append(stripped_line)
-                    if len(batch) == batch_size:
-                        raw_result = self.cut(batch)
-                        lines = "\n".join(" ".join(words) for words in raw_result)
-                        f_out.writelines(lines)
-                        batch = []
-            if batch:
-                raw_result = self.cut(batch)
-                lines = "\n".join(" ".join(words) for words in raw_result)
-                f_out.writelines(lines)
+    def cut_file(self, input_path: Union[str, List[str]], output_path: str, batch_size: int = 1000, target_chars: int = 200000, target_latency: float = 1.0, cache_size: int = 100000, compress: str = None, t2s: bool = False) -> List[dict]:
+        """
+        Cut files line by line. Reading, cutting and writing run in a pipeline through bounded queues,
+        identical lines are cut only once, and the batch size adapts to target_chars and the latency of each batch.
+
+        :param input_path: file, directory or glob pattern, or a list of them. gzip / bz2 / xz files are decompressed on the fly.
+        :param output_path: output file for a single input, output directory for several inputs
+        :param batch_size: number of lines in the first batch
+        :param target_chars: max number of characters per batch
+        :param target_latency: expected seconds per batch, batches shrink when the engine is slower
+        :param cache_size: max number of distinct lines whose results are kept for deduplication
+        :param compress: 'gz' / 'bz2' / 'xz' to compress the output
+        :param t2s: whether to convert traditional Chinese to simplified Chinese on the reader thread before cutting
+        :return: the throughput of each shard
+        """
+        from file_io import expand_inputs, output_paths
+        input_files = expand_inputs(input_path)
+        tuner = _BatchTuner(batch_size, target_chars, target_latency)
+        cache = _CutCache(cache_size)
+        convert = None
+        if t2s:
+            from converter import get_t2s_converter
+            convert = get_t2s_converter().convert
+        stats = []
+        for input_file, output_file in zip(input_files, output_paths(input_files, output_path, compress)):
+            stats.append(self._cut_shard(input_file, output_file, tuner, cache, convert))
+        return stats
+
+    def words_count(self, input_file: Union[str, List[str]], output_file: str, workers: int = 1) -> List[dict]:
+        """
+        Count the words of all the input files and save the aggregated result to output_file.
 
-    def words_count(self, input_file: str, output_file: str) -> None:
-        from collections import Counter
+        :param input_file: file, directory or glob pattern, or a list of them. gzip / bz2 / xz files are decompressed on the fly.
+        :param output_file: output file, compressed when it ends with .gz / .bz2 / .xz
+        :param workers: number of files counted in parallel
+        :return: the throughput of each shard
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from file_io import expand_inputs, open_text
+        input_files = expand_inputs(input_file)
         word_counts = Counter()
-        with open(input_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    words = self.cut([line])[0]
-                    word_counts.update(words)
-        with open(output_file, 'w', encoding='utf-8') as f:
+        stats = []
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(input_files)))) as executor:
+            for path, (counts, lines, chars, seconds) in zip(input_files, executor.map(self._timed_count_file, input_files)):
+                word_counts.update(counts)
+                stats.append(HanSegBase._shard_stats(path, lines, chars, seconds))
+        with open_text(output_file, 'w') as f:
             for word, count in word_counts.most_common():
                 f.write(f"{word} {count}\n")
+        return stats
 
     def reload_engine(self) -> None:
         self._initialize_user_dict()
@@ -130,6 +155,91 @@ class HanSegBase:
             f.writelines(kept_lines)
             f.truncate()
 
+    def _cut_shard(self, input_path: str, output_path: str, tuner: "_BatchTuner", cache: "_CutCache", convert: Callable[[str], str] = None) -> dict:
+        read_queue = queue.Queue(maxsize=_PIPELINE_DEPTH)
+        write_queue = queue.Queue(maxsize=_PIPELINE_DEPTH)
+        stop = threading.Event()
+        errors = []
+        lines_count = chars_count = 0
+        started = time.perf_counter()
+        reader = threading.Thread(target=HanSegBase._read_batches, args=(input_path, read_queue, tuner, stop, errors, convert), daemon=True)
+        writer = threading.Thread(target=HanSegBase._write_batches, args=(output_path, write_queue, stop, errors), daemon=True)
+        reader.start()
+        writer.start()
+        try:
+            while not stop.is_set():
+                batch = HanSegBase._get(read_queue, stop)
+                if batch is None:
+                    break
+                batch_started = time.perf_counter()
+                batch_chars = sum(len(line) for line in batch)
+                lines, cut_chars = self._cut_batch_cached(batch, cache)
+                tuner.update(len(batch), batch_chars, cut_chars, time.perf_counter() - batch_started)
+                lines_count += len(batch)
+                chars_count += batch_chars
+                HanSegBase._put(write_queue, lines, stop)
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            HanSegBase._put(write_queue, None, stop)
+            writer.join()
+            stop.set()
+            reader.join()
+        if errors:
+            raise errors[0]
+        return HanSegBase._shard_stats(input_path, lines_count, chars_count, time.perf_counter() - started)
+
+    def _timed_count_file(self, path: str) -> Tuple[Counter, int, int, float]:
+        started = time.perf_counter()
+        counts, lines, chars = self._count_file(path)
+        return counts, lines, chars, time.perf_counter() - started
+
+    def _count_file(self, path: str) -> Tuple[Counter, int, int]:
+        """Count the words of one shard, return the counter, the number of lines and the number of chars."""
+        from file_io import open_text
+        word_counts = Counter()
+        lines = chars = 0
+        batch = []
+        with open_text(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    batch.append(line)
+                    lines += 1
+                    chars += len(line)
+                    if len(batch) == _COUNT_BATCH_SIZE:
+                        for words in self.cut(batch):
+                            word_counts.update(words)
+                        batch = []
+        if batch:
+            for words in self.cut(batch):
+                word_counts.update(words)
+        return word_counts, lines, chars
+
+    def _cut_batch_cached(self, batch: List[str], cache: "_CutCache") -> Tuple[List[str], int]:
+        """Cut the lines not seen before and return the joined results of the whole batch and the number of chars cut."""
+        keys = [_CutCache.key(line) for line in batch]
+        resolved = {}
+        pending = {}
+        for key, line in zip(keys, batch):
+            if key in resolved or key in pending:
+                continue
+            joined = cache.get(key)
+            if joined is None:
+                pending[key] = line
+            else:
+                resolved[key] = joined
+        cut_chars = 0
+        if pending:
+            texts = list(pending.values())
+            cut_chars = sum(len(text) for text in texts)
+            for key, words in zip(pending, self.cut(texts)):
+                joined = " ".join(words)
+                resolved[key] = joined
+                cache.put(key, joined)
+        return [resolved[key] for key in keys], cut_chars
+
     def _deal_with_raw_cut_result(self, result: List[List[str]], with_position: bool = False) -> Union[List[List[str]], List[List[Tuple[str, int, int]]]]:    
         if with_position:
             result = [HanSegBase._add_position(words) for words in result]
@@ -161,6 +271,78 @@ class HanSegBase:
             config = yaml.safe_load(f)
         return config
 
+    @staticmethod
+    def _read_batches(input_path: str, read_queue: queue.Queue, tuner: "_BatchTuner", stop: threading.Event, errors: list, convert: Callable[[str], str] = None) -> None:
+        """Reader thread of cut_file: group the non-empty stripped lines, converted by convert if given, into batches sized by the tuner."""
+        from file_io import open_text
+        try:
+            with open_text(input_path) as f_in:
+                batch = []
+                for line in f_in:
+                    stripped_line = line.strip()
+                    if stripped_line:
+                        batch.append(convert(stripped_line) if convert else stripped_line)
+                        if len(batch) >= tuner.batch_size:
+                            if not HanSegBase._put(read_queue, batch, stop):
+                                return
+                            batch = []
+                if batch:
+                    HanSegBase._put(read_queue, batch, stop)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            HanSegBase._put(read_queue, None, stop)
+
+    @staticmethod
+    def _write_batches(output_path: str, write_queue: queue.Queue, stop: threading.Event, errors: list) -> None:
+        """Writer thread of cut_file: one result per line, without a trailing newline."""
+        from file_io import open_text
+        try:
+            with open_text(output_path, 'w') as f_out:
+                first = True
+                while True:
+                    lines = HanSegBase._get(write_queue, stop)
+                    if lines is None:
+                        break
+                    if not lines:
+                        continue
+                    if not first:
+                        f_out.write("\n")
+                    f_out.write("\n".join(lines))
+                    first = False
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    @staticmethod
+    def _shard_stats(path: str, lines: int, chars: int, seconds: float) -> dict:
+        """Log and return the throughput of one shard."""
+        chars_per_sec = chars / seconds if seconds > 0 else 0.0
+        logging.info(f"{path}: {lines} lines, {chars} chars in {seconds:.2f}s ({chars_per_sec:.0f} chars/s)")
+        return {'path': path, 'lines': lines, 'chars': chars, 'seconds': seconds, 'chars_per_sec': chars_per_sec}
+
+    @staticmethod
+    def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+        """Put item into a bounded queue, giving up when the pipeline is stopped."""
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if stop.is_set():
+                    return False
+
+    @staticmethod
+    def _get(q: queue.Queue, stop: threading.Event):
+        """Get an item from a bounded queue, returning None when the pipeline is stopped."""
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    return None
+
     @staticmethod
     def _add_position(words: List[str]) -> List[Tuple[str, int, int]]:
         """Add position information to each word. Please use it before filtering stop words."""
@@ -172,5 +354,66 @@ class HanSegBase:
             start = end
         return result
 
+
+_PIPELINE_DEPTH = 4
+_COUNT_BATCH_SIZE = 1000
+
+
+class _BatchTuner:
+    """Adapt the number of lines per batch of cut_file to a target chars-per-batch and the measured latency."""
+    MIN_BATCH_SIZE = 16
+    MAX_BATCH_SIZE = 100000
+    SMOOTHING = 0.3
+
+    def __init__(self, batch_size: int, target_chars: int, target_latency: float):
+        if batch_size <= 0 or target_chars <= 0 or target_latency <= 0:
+            raise HanSegError("batch_size, target_chars and target_latency must be positive.")
+        self.batch_size = batch_size
+        self.target_chars = target_chars
+        self.target_latency = target_latency
+        self._chars_per_line: Optional[float] = None
+        self._chars_per_sec: Optional[float] = None
+
+    def update(self, lines: int, chars: int, cut_chars: int, elapsed: float) -> None:
+        self._chars_per_line = self._smooth(self._chars_per_line, chars / lines)
+        if cut_chars and elapsed > 0:
+            self._chars_per_sec = self._smooth(self._chars_per_sec, cut_chars / elapsed)
+        budget = self.target_chars
+        if self._chars_per_sec is not None:
+            budget = min(budget, self._chars_per_sec * self.target_latency)
+        size = int(budget / max(self._chars_per_line, 1.0))
+        self.batch_size = max(self.MIN_BATCH_SIZE, min(self.MAX_BATCH_SIZE, size))
+
+    def _smooth(self, current: Optional[float], value: float) -> float:
+        if current is None:
+            return value
+        return current + self.SMOOTHING * (value - current)
+
+
+class _CutCache:
+    """Bounded LRU table from the content hash of a line to its joined cut result."""
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._table = OrderedDict()
+
+    def get(self, key: bytes) -> Optional[str]:
+        value = self._table.get(key)
+        if value is not None:
+            self._table.move_to_end(key)
+        return value
+
+    def put(self, key: bytes, value: str) -> None:
+        if self.max_size <= 0:
+            return
+        self._table[key] = value
+        self._table.move_to_end(key)
+        if len(self._table) > self.max_size:
+            self._table.popitem(last=False)
+
+    @staticmethod
+    def key(line: str) -> bytes:
+        return hashlib.blake2b(line.encode('utf-8'), digest_size=16).digest()
+
+
 class HanSegError(Exception):
     pass
\ No newline at end of file
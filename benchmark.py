@@ -0,0 +1,107 @@
+# benchmark.py
+
+import time
+from typing import List, Tuple
+import torch
+from base import HanSegBase, HanSegError
+from file_io import open_text
+from engines.hanlp_engine import HanSegHanLP
+
+INPUT_PATH = "user_data/file_cut/input_file.txt"
+USER_DICT = "user_data/dict/user_dict.txt"
+CONFIG_PATH = "config.yaml"
+
+
+def _load_lines(input_path: str, limit: int = None) -> List[str]:
+    lines = []
+    with open_text(input_path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                lines.append(line)
+                if limit and len(lines) >= limit:
+                    break
+    return lines
+
+
+def _spans(words: List[str]) -> set:
+    return {(start, end) for _, start, end in HanSegBase._add_position(words)}
+
+
+def _timed(func, *args) -> Tuple[object, float]:
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def _run(engine: HanSegHanLP, texts: List[str], pos_inputs: List[List[str]] = None) -> Tuple[List[List[str]], List[List[str]], float, float]:
+    """Warm up once untimed, then time cut on texts and the POS model on pos_inputs (the cut result by default)."""
+    with torch.inference_mode():
+        engine._pos(engine.cut(texts[:1])[0])
+    words, cut_seconds = _timed(engine.cut, texts)
+    if pos_inputs is None:
+        pos_inputs = words
+    with torch.inference_mode():
+        tags, pos_seconds = _timed(lambda: [engine._pos(tokens) for tokens in pos_inputs])
+    return words, tags, cut_seconds, pos_seconds
+
+
+def _rate(count: int, seconds: float) -> float:
+    return count / seconds if seconds > 0 else 0.0
+
+
+def benchmark_hanlp(input_path: str = INPUT_PATH, config_path: str = CONFIG_PATH, user_dict: str = USER_DICT, limit: int = 1000) -> dict:
+    """
+    Compare the hanlp engine configured in config_path with the fp32 baseline (no quantization, default threads).
+    Reports the chars/s of cut and the tokens/s of POS tagging for both, the token-level F1 of the configured
+    tokenizer against the baseline, and the accuracy of the configured POS tagger on the baseline tokens.
+    Each instance gets one untimed warm-up call, so that the speedup does not depend on the warmup setting.
+    """
+    config = HanSegBase._load_config(config_path).get('hanlp', {}) or {}
+    baseline_config = dict(config, quantize=False, num_threads=0, interop_threads=0)
+    texts = _load_lines(input_path, limit)
+    if not texts:
+        raise HanSegError(f"No lines to benchmark in {input_path}.")
+    chars = sum(len(text) for text in texts)
+
+    baseline = HanSegHanLP('hanlp', False, user_dict, False, None, baseline_config)
+    base_words, base_tags, base_cut_seconds, base_pos_seconds = _run(baseline, texts)
+    del baseline
+    tokens = sum(len(words) for words in base_words)
+
+    profiled = HanSegHanLP('hanlp', False, user_dict, False, None, config)
+    words, tags, cut_seconds, pos_seconds = _run(profiled, texts, base_words)
+
+    matched = predicted = gold = 0
+    for expected, actual in zip(base_words, words):
+        expected_spans, actual_spans = _spans(expected), _spans(actual)
+        matched += len(expected_spans & actual_spans)
+        predicted += len(actual_spans)
+        gold += len(expected_spans)
+    precision = matched / predicted if predicted else 1.0
+    recall = matched / gold if gold else 1.0
+    tok_f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    same_tags = sum(a == b for expected, actual in zip(base_tags, tags) for a, b in zip(expected, actual))
+    total_tags = sum(len(expected) for expected in base_tags)
+    pos_accuracy = same_tags / total_tags if total_tags else 1.0
+
+    return {
+        'lines': len(texts),
+        'chars': chars,
+        'tokens': tokens,
+        'baseline_cut_chars_per_sec': _rate(chars, base_cut_seconds),
+        'cut_chars_per_sec': _rate(chars, cut_seconds),
+        'cut_speedup': _rate(base_cut_seconds, cut_seconds),
+        'baseline_pos_tokens_per_sec': _rate(tokens, base_pos_seconds),
+        'pos_tokens_per_sec': _rate(tokens, pos_seconds),
+        'pos_speedup': _rate(base_pos_seconds, pos_seconds),
+        'speedup': _rate(base_cut_seconds + base_pos_seconds, cut_seconds + pos_seconds),
+        'tok_f1': tok_f1,
+        'pos_accuracy': pos_accuracy,
+    }
+
+
+if __name__ == '__main__':
+    for key, value in benchmark_hanlp().items():
+        print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
@@ -0,0 +1,55 @@
+# converter.py
+
+from typing import List, Dict, Iterable
+from functools import lru_cache
+import re
+
+
+class T2SConverter:
+    """Traditional to simplified Chinese conversion with tables precomputed once from SnowNLP's data."""
+    def __init__(self, mapping: Dict[str, str]):
+        self._table = str.maketrans({k: v for k, v in mapping.items() if len(k) == 1})
+        self._phrases = {k: v for k, v in mapping.items() if len(k) > 1}
+        if self._phrases:
+            # Longer phrases first, so that the regex alternation matches the longest phrase at each position.
+            alternation = '|'.join(re.escape(k) for k in sorted(self._phrases, key=len, reverse=True))
+            self._pattern = re.compile(alternation)
+        else:
+            self._pattern = None
+
+    def convert(self, text: str) -> str:
+        if self._pattern is None:
+            return text.translate(self._table)
+        parts = []
+        last = 0
+        for match in self._pattern.finditer(text):
+            parts.append(text[last:match.start()].translate(self._table))
+            parts.append(self._phrases[match.group()])
+            last = match.end()
+        parts.append(text[last:].translate(self._table))
+        return ''.join(parts)
+
+    def convert_batch(self, texts: Iterable[str]) -> List[str]:
+        return [self.convert(text) for text in texts]
+
+
+@lru_cache(maxsize=None)
+def get_t2s_converter() -> T2SConverter:
+    """Build the converter once from snownlp.normal.zh.zh2hans."""
+    from snownlp.normal import zh
+    return T2SConverter(zh.zh2hans)
+
+
+def pinyin_batch(texts: Iterable[str]) -> List[List[str]]:
+    """
+    Pinyin of each text. SnowNLP loads its pinyin trie once at import and already matches the longest phrase,
+    so the batch only skips the per-call SnowNLP object and converts identical texts once.
+    """
+    from snownlp.normal import get_pinyin
+    seen = {}
+    result = []
+    for text in texts:
+        if text not in seen:
+            seen[text] = get_pinyin(text)
+        result.append(list(seen[text]))
+    return result
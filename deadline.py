@@ -0,0 +1,194 @@
+# deadline.py
+
+from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import logging
+import queue
+import threading
+import time
+
+
+class EngineResult(list):
+    """A list result which records the name of the engine that produced it."""
+    def __init__(self, result, engine: str):
+        super().__init__(result)
+        self.engine = engine
+
+
+class LatencyModel:
+    """
+    Per engine and method linear model of latency against text length, fitted by exponentially decayed least squares.
+    An engine predicted to be too slow gets no traffic, so should_probe lets through one shadow call per probe_interval
+    to keep its model up to date.
+    """
+    def __init__(self, decay: float = 0.95, min_samples: int = 5, probe_interval: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.decay = decay
+        self.min_samples = min_samples
+        self.probe_interval = probe_interval
+        self._clock = clock
+        self._stats: Dict[Tuple[str, str], List[float]] = {}
+        self._last_probe: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, engine: str, method: str, chars: int, seconds: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault((engine, method), [0.0] * 6)
+            for i in range(5):
+                stats[i] *= self.decay
+            stats[0] += 1.0
+            stats[1] += chars
+            stats[2] += seconds
+            stats[3] += chars * chars
+            stats[4] += chars * seconds
+            stats[5] += 1
+
+    def predict(self, engine: str, method: str, chars: int) -> Optional[float]:
+        """Return the expected seconds, or None when there are not enough observations yet."""
+        with self._lock:
+            stats = self._stats.get((engine, method))
+            if stats is None or stats[5] < self.min_samples:
+                return None
+            weight, sum_x, sum_y, sum_xx, sum_xy, _ = stats
+        variance = weight * sum_xx - sum_x * sum_x
+        if variance <= 1e-9 * weight * weight:
+            return sum_y / weight
+        slope = max((weight * sum_xy - sum_x * sum_y) / variance, 0.0)
+        intercept = (sum_y - slope * sum_x) / weight
+        return max(intercept + slope * chars, 0.0)
+
+    def should_probe(self, engine: str, method: str) -> bool:
+        """Return True at most once per probe_interval for each engine and method."""
+        with self._lock:
+            now = self._clock()
+            last = self._last_probe.get((engine, method))
+            if last is not None and now - last < self.probe_interval:
+                return False
+            self._last_probe[(engine, method)] = now
+            return True
+
+
+class DaemonWorker:
+    """
+    A single daemon thread running the submitted calls one at a time, in order.
+    Unlike ThreadPoolExecutor, a call that hangs does not block interpreter exit.
+    """
+    def __init__(self, name: str = None):
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, func: Callable, *args) -> Future:
+        if self._closed:
+            raise RuntimeError("Cannot submit to a closed worker.")
+        future = Future()
+        self._queue.put((future, func, args))
+        return future
+
+    def close(self) -> None:
+        """Stop the thread once the calls already submitted are done, without waiting for them."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, func, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+
+PROBE_TEXT = "我们希望这段文字只用于探测分词引擎的延迟。"
+
+
+class DeadlineRouter:
+    """
+    Run cut / pos / keywords on a main engine, or on a fallback engine when a timeout would be exceeded.
+
+    Calls without a timeout run on the caller's thread. Calls with a timeout run on one DaemonWorker, so that the caller
+    can stop waiting; while a timed call overruns on that worker, the next timed calls go to the fallback instead of queueing behind it.
+    Engines whose state is shared between calls must protect it themselves, as HanSegHanLP does for its tokenizer.
+    """
+    def __init__(self, engine, engine_name: str, fallback=None, fallback_name: str = None, latency: LatencyModel = None, probe_factor: float = 2.0):
+        """
+        :param probe_factor: a call predicted to exceed its timeout is used as a shadow probe of the main engine only when
+            the prediction is within probe_factor times the timeout, otherwise the short PROBE_TEXT is used
+        """
+        self.engine = engine
+        self.engine_name = engine_name
+        self.fallback = fallback
+        self.fallback_name = fallback_name
+        self.latency = latency or LatencyModel()
+        self.probe_factor = probe_factor
+        self._worker = DaemonWorker(name=f"hanseg-{engine_name}") if fallback is not None else None
+        self._inflight: Optional[Future] = None
+
+    def run(self, method: str, chars: int, timeout: Optional[float], *args) -> EngineResult:
+        if timeout is None:
+            return self._timed_call(self.engine, self.engine_name, method, chars, *args)
+        if self.fallback is None:
+            raise ValueError("A fallback engine is required to run with a timeout.")
+        if timeout <= 0:
+            logging.info(f"The deadline of {self.engine_name}.{method} has passed, using {self.fallback_name} instead.")
+        elif self.busy():
+            logging.info(f"{self.engine_name} is still busy, using {self.fallback_name} instead.")
+        else:
+            predicted = self.latency.predict(self.engine_name, method, chars)
+            if predicted is not None and predicted > timeout:
+                logging.info(f"{self.engine_name}.{method} is predicted to take {predicted:.3f}s > {timeout:.3f}s, using {self.fallback_name} instead.")
+                if self.latency.should_probe(self.engine_name, method):
+                    self._probe(method, chars, predicted <= self.probe_factor * timeout, *args)
+            else:
+                future = self._submit(method, chars, *args)
+                try:
+                    return future.result(timeout=timeout)
+                except FutureTimeoutError:
+                    future.cancel()
+                    logging.info(f"{self.engine_name}.{method} exceeded {timeout:.3f}s, using {self.fallback_name} instead.")
+        return self._timed_call(self.fallback, self.fallback_name, method, chars, *args)
+
+    def busy(self) -> bool:
+        return self._inflight is not None and not self._inflight.done()
+
+    def close(self) -> None:
+        if self._worker is not None:
+            self._worker.close()
+
+    def _probe(self, method: str, chars: int, use_call: bool, *args) -> None:
+        """
+        Send a shadow call to the main engine, so that its latency model is updated although it gets no traffic.
+        A text predicted far beyond the timeout would keep the worker busy, so a short sample is sent instead.
+        """
+        if use_call:
+            self._submit(method, chars, *args, probe=True)
+        elif method == 'cut':
+            self._submit(method, len(PROBE_TEXT), [PROBE_TEXT], probe=True)
+        else:
+            self._submit(method, len(PROBE_TEXT), PROBE_TEXT, probe=True)
+
+    def _submit(self, method: str, chars: int, *args, probe: bool = False) -> Future:
+        """
+        Run method of the main engine on the worker. A probe is short or rare, so it does not make the worker busy:
+        the calls after it wait in the queue, within their own timeout.
+        """
+        future = self._worker.submit(self._timed_call, self.engine, self.engine_name, method, chars, *args)
+        if not probe:
+            self._inflight = future
+        return future
+
+    def _timed_call(self, engine, engine_name: str, method: str, chars: int, *args) -> EngineResult:
+        started = time.perf_counter()
+        result = getattr(engine, method)(*args)
+        if method == 'cut':
+            # Some engines return generators, consume them so that the time measured is the time of the cut.
+            result = [list(words) for words in result]
+        result = EngineResult(result or [], engine_name)
+        self.latency.observe(engine_name, method, chars, time.perf_counter() - started)
+        return result
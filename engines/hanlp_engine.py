@@ -1,11 +1,18 @@
 import logging
+import threading
+from collections import Counter
 from typing import List, Tuple, Union
 from base import HanSegBase, HanSegError
+from file_io import open_text
+import torch
 from hanlp import hanlp
 from hanlp_restful import HanLPClient
 from hanlp.pretrained.tok import COARSE_ELECTRA_SMALL_ZH, FINE_ELECTRA_SMALL_ZH
 from hanlp.pretrained.pos import CTB9_POS_ELECTRA_SMALL
 
+_WARMUP_TEXT = "HanLP为生产环境带来次世代最先进的多语种NLP技术。"
+
+
 class HanSegHanLP(HanSegBase):
     def __init__(self, engine_name: str, multi_engines: bool, user_dict: str, filt: bool, stop_words_path: str, local_config: dict):
         super().__init__(engine_name, multi_engines, user_dict, filt, stop_words_path, local_config)
@@ -17,13 +24,23 @@ class HanSegHanLP(HanSegBase):
         else:
             raise HanSegError(f'Invalid cut_mode: {self.cut_mode}')
         self._pos = hanlp.load(CTB9_POS_ELECTRA_SMALL)
+        # output_spans is part of the shared tokenizer config, so it is only set and used while holding this lock.
+        self._tok_lock = threading.Lock()
+        self.quantize = local_config.get('quantize', False)
+        self.num_threads = local_config.get('num_threads', 0)
+        self.interop_threads = local_config.get('interop_threads', 0)
+        self.warmup = local_config.get('warmup', True)
+        self._set_threads()
+        self._tok = self._optimize(self._tok)
+        self._pos = self._optimize(self._pos)
         self._set_custom_dict()
+        if self.warmup:
+            self._warmup()
         auth = local_config.get('auth', None)
         self._client = HanLPClient('https://www.hanlp.com/api', auth=auth, language='zh')
 
     def cut(self, texts: List[str], with_position = False) -> Union[List[List[str]], List[List[Tuple[str, int, int]]]]:
-        self._tok.config.output_spans = True if with_position else False
-        result = self._tok(texts)
+        result = self._tokenize(texts, with_position)
         if self.filt:
             if with_position:            
                 result = [[(word, start, end) for word, start, end in words if word not in self.stop_words] for words in result]
@@ -47,7 +64,8 @@ class HanSegHanLP(HanSegBase):
             logging.warning(e)
             logging.warning("hanlp_restful is not available, using local model instead.")
             words = self.cut([text])[0]
-            tags = self._pos(words)
+            with torch.inference_mode():
+                tags = self._pos(words)
             result = [(word, tag) for word, tag in zip(words, tags)]
         if self.filt:
             result = [(word, tag) for word, tag in result if word not in self.stop_words]
@@ -63,27 +81,68 @@ class HanSegHanLP(HanSegBase):
 
     def set_model(self, tok_model: str = None, pos_model: str = None) -> None:
         if tok_model is not None:
-            self._tok = hanlp.load(tok_model)
+            self._tok = self._optimize(hanlp.load(tok_model))
         if pos_model is not None:
-            self._pos = hanlp.load(pos_model)
+            self._pos = self._optimize(hanlp.load(pos_model))
+        if self.warmup:
+            self._warmup()
 
-    def words_count(self, input_file: str, output_file: str) -> None:
-        from collections import Counter
-        word_counts = Counter()
-        with open(input_file, 'r', encoding='utf-8') as f:
+    def _count_file(self, path: str) -> Tuple[Counter, int, int]:
+        with open_text(path) as f:
             texts = f.read()
         processor = hanlp.pipeline().append(hanlp.utils.rules.split_sentence).append(self._tok).append(lambda sents: sum(sents, []))
-        words = processor(texts)
+        with self._tok_lock, torch.inference_mode():
+            self._tok.config.output_spans = False
+            words = processor(texts)
         if self.filt:
             words = [word for word in words if word not in self.stop_words]
-        word_counts.update(words)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            for word, count in word_counts.most_common():
-                f.write(f"{word} {count}\n")
+        lines = [line for line in texts.splitlines() if line.strip()]
+        return Counter(words), len(lines), sum(len(line.strip()) for line in lines)
     
     def reload_engine(self):
         self._set_custom_dict()
         
+    def _set_threads(self) -> None:
+        """torch thread pools are shared by the whole process, so the last HanSegHanLP instance created wins."""
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        if self.interop_threads:
+            try:
+                torch.set_num_interop_threads(self.interop_threads)
+            except RuntimeError as e:
+                logging.warning(f"Failed to set interop_threads: {e}")
+
+    def _optimize(self, component):
+        """Apply int8 dynamic quantization to the Linear layers of a hanlp component, if enabled."""
+        if not self.quantize:
+            return component
+        model = getattr(component, 'model', None)
+        if not isinstance(model, torch.nn.Module):
+            logging.warning(f"{type(component).__name__} is not a PyTorch component, skip quantization.")
+            return component
+        if torch.backends.quantized.engine == 'none':
+            logging.warning("No quantized engine is available in this PyTorch build, skip quantization.")
+            return component
+        parameter = next(model.parameters(), None)
+        if parameter is not None and parameter.device.type != 'cpu':
+            logging.warning(f"{type(component).__name__} is loaded on {parameter.device}, int8 dynamic quantization only runs on CPU, skip quantization.")
+            return component
+        model.eval()
+        component.model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return component
+
+    def _tokenize(self, texts: List[str], with_position: bool = False) -> Union[List[List[str]], List[List[Tuple[str, int, int]]]]:
+        with self._tok_lock, torch.inference_mode():
+            tok = self._tok
+            tok.config.output_spans = with_position
+            return tok(texts)
+
+    def _warmup(self) -> None:
+        """Run the models once, so that the first real call does not pay for lazy initialization."""
+        words = self._tokenize([_WARMUP_TEXT])[0]
+        with torch.inference_mode():
+            self._pos(words)
+
     def _set_custom_dict(self) -> None:
         with open(self.user_dict_path, 'r', encoding='utf-8') as f:
             custom_words = set()
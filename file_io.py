@@ -0,0 +1,99 @@
+# file_io.py
+
+from typing import List, Union, IO
+import bz2
+import glob
+import gzip
+import lzma
+import os
+from base import HanSegError
+
+
+COMPRESSORS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+    '.lzma': lzma.open,
+}
+
+
+def expand_inputs(inputs: Union[str, List[str]]) -> List[str]:
+    """Expand files, directories (recursively) and glob patterns into a sorted list of files, keeping the order of the arguments."""
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    files = []
+    seen = set()
+    for spec in inputs:
+        if os.path.isdir(spec):
+            matched = []
+            for root, dirs, names in os.walk(spec):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                matched.extend(os.path.join(root, name) for name in names if not name.startswith('.'))
+        elif glob.has_magic(spec):
+            matched = [path for path in glob.glob(spec, recursive=True) if os.path.isfile(path)]
+        elif os.path.isfile(spec):
+            matched = [spec]
+        else:
+            raise HanSegError(f"Input {spec} not found.")
+        for path in sorted(matched):
+            if path not in seen:
+                seen.add(path)
+                files.append(path)
+    if not files:
+        raise HanSegError(f"No input files found in {inputs}.")
+    return files
+
+
+def open_text(path: str, mode: str = 'r') -> IO[str]:
+    """Open a plain or gzip / bz2 / xz compressed text file in utf-8, chosen by the extension of path."""
+    opener = COMPRESSORS.get(os.path.splitext(path)[1].lower())
+    if opener is None:
+        return open(path, mode, encoding='utf-8')
+    return opener(path, mode + 't', encoding='utf-8')
+
+
+def strip_compression_suffix(path: str) -> str:
+    root, ext = os.path.splitext(path)
+    return root if ext.lower() in COMPRESSORS else path
+
+
+def add_compression_suffix(path: str, compress: str = None) -> str:
+    """Append '.gz', '.bz2' or '.xz' to path for compress in ('gz', 'bz2', 'xz'), unless it is already there."""
+    if not compress:
+        return path
+    suffix = '.' + compress.lower().lstrip('.')
+    if suffix not in COMPRESSORS:
+        raise HanSegError(f"Invalid compress: {compress}. You must set it to 'gz', 'bz2' or 'xz'.")
+    return path if path.lower().endswith(suffix) else path + suffix
+
+
+def output_paths(input_files: List[str], output_path: str, compress: str = None) -> List[str]:
+    """
+    Map input shards to output files. A single input is written to output_path,
+    several inputs are written into the directory output_path, keeping their relative layout.
+    Raises HanSegError when two inputs map to the same output, or an output is one of the inputs.
+    """
+    if len(input_files) == 1 and not os.path.isdir(output_path):
+        result = [add_compression_suffix(output_path, compress)]
+    else:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in input_files])
+        result = []
+        for path in input_files:
+            relative = strip_compression_suffix(os.path.relpath(os.path.abspath(path), root))
+            result.append(add_compression_suffix(os.path.join(output_path, relative), compress))
+    inputs = {_path_key(path): path for path in input_files}
+    sources = {}
+    for path, target in zip(input_files, result):
+        key = _path_key(target)
+        if key in inputs:
+            raise HanSegError(f"Output {target} of {path} would overwrite the input {inputs[key]}.")
+        if key in sources:
+            raise HanSegError(f"Inputs {sources[key]} and {path} would both be written to {target}.")
+        sources[key] = path
+    for target in result:
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    return result
+
+
+def _path_key(path: str) -> str:
+    return os.path.normcase(os.path.realpath(path))
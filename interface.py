@@ -1,13 +1,17 @@
 # interface.py
 
 import logging
+import time
 from base import HanSegBase, HanSegError
-from typing import List, Tuple, Dict, Union
+from typing import List, Tuple, Dict, Union, Optional
 from engines.jieba_engine import HanSegJieba
 from engines.thulac_engine import HanSegThulac
 from engines.pkuseg_engine import HanSegPkuseg
 from engines.snownlp_engine import HanSegSnowNLP
 from engines.hanlp_engine import HanSegHanLP
+from converter import get_t2s_converter, pinyin_batch
+from file_io import open_text
+from deadline import EngineResult, DeadlineRouter
 
 
 ENGINE_MAP: Dict[str, HanSegBase] = {
@@ -20,7 +24,7 @@ ENGINE_MAP: Dict[str, HanSegBase] = {
 
 class HanSeg:
     """HanSeg interface class."""
-    def __init__(self, engine_name: str = 'jieba', multi_engines: bool = True, user_dict: str = None, filt: bool = False, stop_words_path: str = None, config_path: str = "config.yaml"):
+    def __init__(self, engine_name: str = 'jieba', multi_engines: bool = True, user_dict: str = None, filt: bool = False, stop_words_path: str = None, config_path: str = "config.yaml", t2s_stage: bool = False, fallback_engine: str = None):
         """
         :param engine_name: jieba / thulac / pkuseg / snownlp / hanlp
         :param multi_engines: whether to use multiple engines
@@ -28,12 +32,15 @@ class HanSeg:
         :param filt: whether to filter out stopwords
         :param stop_words_path: path to stop words file
         :param config_path: path to config file
+        :param t2s_stage: whether to convert traditional Chinese to simplified Chinese before cut and cut_file, positions then index the simplified text
+        :param fallback_engine: fast engine used by cut / pos / keywords when the timeout would be exceeded, e.g. jieba
         """
         self.engine_name = engine_name.lower()
         self.multi_engines = multi_engines
         self.user_dict = user_dict
         self.filt = filt
         self.stop_words_path = stop_words_path
+        self.t2s_stage = t2s_stage
         self.config = HanSegBase._load_config(config_path)
 
         if self.engine_name not in ENGINE_MAP:
@@ -48,13 +55,47 @@ class HanSeg:
             self.config.get(self.engine_name, {})
         )
 
-    def cut(self, texts: List[str], with_position: bool = False) -> Union[List[List[str]], List[List[Tuple[str, int, int]]]]:
-        """Standard cut method, returns a list of tokens."""
-        return self._engine.cut(texts, with_position)
+        self.fallback_engine = fallback_engine.lower() if fallback_engine else None
+        self._fallback: Optional[HanSegBase] = None
+        if self.fallback_engine is not None:
+            if self.fallback_engine not in ENGINE_MAP:
+                raise HanSegError(f"Fallback engine '{self.fallback_engine}' is not supported. Supported engines: {', '.join(ENGINE_MAP)}.")
+            if self.fallback_engine == self.engine_name:
+                raise HanSegError("fallback_engine must be different from engine_name.")
+            # 'default' only means something to pkuseg, the other engines run without a user dict then.
+            fallback_user_dict = None if self.user_dict == 'default' and self.fallback_engine != 'pkuseg' else self.user_dict
+            self._fallback = ENGINE_MAP[self.fallback_engine](
+                self.fallback_engine,
+                self.multi_engines,
+                fallback_user_dict,
+                self.filt,
+                self.stop_words_path,
+                self.config.get(self.fallback_engine, {})
+            )
+        # Only an instance with a fallback engine starts a worker thread, for the calls with a timeout.
+        self._router = DeadlineRouter(self._engine, self.engine_name, self._fallback, self.fallback_engine)
 
-    def pos(self, text: str) -> List[Tuple[str, str]]:
-        """Returns the tokens and their corresponding POS tags."""
-        return self._engine.pos(text)
+    def close(self) -> None:
+        """Stop the worker thread used by calls with a timeout. A call still running is abandoned and does not block exit."""
+        self._router.close()
+
+    def cut(self, texts: List[str], with_position: bool = False, timeout: float = None, deadline: float = None) -> Union[List[List[str]], List[List[Tuple[str, int, int]]]]:
+        """
+        Standard cut method, returns a list of tokens.
+
+        :param with_position: whether to return (word, start, end) tuples. With t2s_stage, the offsets index the simplified text,
+            which can differ in length from the text passed in, since some phrases convert to a different number of characters.
+        :param timeout: seconds allowed for the call, the fallback engine is used when the main engine would exceed it
+        :param deadline: the same as timeout, as an absolute time.monotonic() value
+        :return: the tokens of each text, with an engine attribute naming the engine that produced them
+        """
+        if self.t2s_stage:
+            texts = HanSeg.t2s_batch(texts)
+        return self._run_with_deadline('cut', sum(len(text) for text in texts), timeout, deadline, texts, with_position)
+
+    def pos(self, text: str, timeout: float = None, deadline: float = None) -> List[Tuple[str, str]]:
+        """Returns the tokens and their corresponding POS tags. timeout and deadline work as in cut."""
+        return self._run_with_deadline('pos', len(text), timeout, deadline, text)
 
     def add_word(self, word: str, freq: int = 1, tag: str = None):
         """Dynamically add words or add words to user_dict, if supported by the engine."""
@@ -68,23 +109,36 @@ class HanSeg:
         """Only for jieba"""
         self._engine.suggest_freq(words)
 
-    def keywords(self, text: str, limit: int = 10, with_weight: bool = False) -> Union[List[str], List[Tuple[str, float]]]:
-        """Keywordss extract method, return a list of keywordss or (keywords, weight) tuples, depends on the config."""
-        return self._engine.keywords(text, limit, with_weight)
+    def keywords(self, text: str, limit: int = 10, with_weight: bool = False, timeout: float = None, deadline: float = None) -> Union[List[str], List[Tuple[str, float]]]:
+        """Keywordss extract method, return a list of keywordss or (keywords, weight) tuples, depends on the config. timeout and deadline work as in cut."""
+        return self._run_with_deadline('keywords', len(text), timeout, deadline, text, limit, with_weight)
 
-    def cut_file(self, input_path: str, output_path: str, batch_size: int = 100) -> None:
+    def cut_file(self, input_path: Union[str, List[str]], output_path: str, batch_size: int = 1000, target_chars: int = 200000, target_latency: float = 1.0, cache_size: int = 100000, compress: str = None) -> List[dict]:
         """
-        Cut a file, line by line, and save the result to output_path.
+        Cut files, line by line, and save the result to output_path.
+        Identical lines are cut only once, and the batch size adapts to the length of the lines and the speed of the engine.
 
-        :param input_path: path to input file
-        :param output_path: path to output file
-        :return: None
+        :param input_path: path to input file, directory or glob pattern, or a list of them. gzip / bz2 / xz files are supported.
+        :param output_path: path to output file, or output directory when there are several input files
+        :param batch_size: number of lines in the first batch
+        :param target_chars: max number of characters per batch
+        :param target_latency: expected seconds per batch
+        :param cache_size: max number of distinct lines kept for deduplication, 0 to disable
+        :param compress: 'gz' / 'bz2' / 'xz' to compress the output
+        :return: lines, chars, seconds and chars_per_sec of each input file
         """
-        self._engine.cut_file(input_path, output_path, batch_size)
+        return self._engine.cut_file(input_path, output_path, batch_size, target_chars, target_latency, cache_size, compress, self.t2s_stage)
 
-    def words_count(self, input_file: str, output_file: str) -> None:
-        """Count the words in a file, and save the result to output_file."""
-        self._engine.words_count(input_file, output_file)
+    def words_count(self, input_file: Union[str, List[str]], output_file: str, workers: int = 1) -> List[dict]:
+        """
+        Count the words in files, and save the aggregated result to output_file.
+
+        :param input_file: path to input file, directory or glob pattern, or a list of them. gzip / bz2 / xz files are supported.
+        :param output_file: path to output file, compressed when it ends with .gz / .bz2 / .xz
+        :param workers: number of files counted in parallel
+        :return: lines, chars, seconds and chars_per_sec of each input file
+        """
+        return self._engine.words_count(input_file, output_file, workers)
         
     def reload_engine(self) -> None:
         """Reload the engine."""
@@ -142,6 +196,15 @@ class HanSeg:
             _sim = hanlp.load(STS_ELECTRA_BASE_ZH)
             return _sim(text_pair)
 
+    def _run_with_deadline(self, method: str, chars: int, timeout: Optional[float], deadline: Optional[float], *args) -> EngineResult:
+        """Run method on the main engine, or on the fallback engine when the timeout or deadline would be exceeded."""
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        if timeout is not None and self._fallback is None:
+            raise HanSegError("fallback_engine is not set, timeout and deadline are not supported.")
+        return self._router.run(method, chars, timeout, *args)
+
     def _get_hanlp_client(self):
         hanlp_config = self.config.get('hanlp', {})
         auth = hanlp_config.get('auth', None)
@@ -172,11 +235,32 @@ class HanSeg:
     @staticmethod
     def pinyin(text: str) -> List[str]:
         """Return the pinyin of the text."""
-        from snownlp import SnowNLP
-        return SnowNLP(text).pinyin
+        return pinyin_batch([text])[0]
+
+    @staticmethod
+    def pinyin_batch(texts: List[str]) -> List[List[str]]:
+        """Return the pinyin of each text."""
+        return pinyin_batch(texts)
 
     @staticmethod
     def t2s(text: str) -> str:
         """Convert traditional Chinese to simplified Chinese."""
-        from snownlp import SnowNLP
-        return SnowNLP(text).han
\ No newline at end of file
+        return get_t2s_converter().convert(text)
+
+    @staticmethod
+    def t2s_batch(texts: List[str]) -> List[str]:
+        """Convert each text from traditional Chinese to simplified Chinese."""
+        return get_t2s_converter().convert_batch(texts)
+
+    @staticmethod
+    def t2s_file(input_path: str, output_path: str) -> None:
+        """
+        Convert a file from traditional Chinese to simplified Chinese, line by line.
+
+        :param input_path: path to input file, gzip / bz2 / xz files are supported
+        :param output_path: path to output file, compressed when it ends with .gz / .bz2 / .xz
+        """
+        converter = get_t2s_converter()
+        with open_text(input_path) as f_in, open_text(output_path, 'w') as f_out:
+            for line in f_in:
+                f_out.write(converter.convert(line))
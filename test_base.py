@@ -0,0 +1,114 @@
+# test_base.py
+
+import pytest
+from base import HanSegBase, HanSegError, _BatchTuner, _CutCache
+
+
+class CharEngine(HanSegBase):
+    """Cuts every text into characters, recording the texts it was asked to cut."""
+    def __init__(self, fail_on: str = None):
+        super().__init__('stub', False, None, False, None, {})
+        self.fail_on = fail_on
+        self.cut_texts = []
+
+    def cut(self, texts, with_position=False):
+        if self.fail_on is not None and self.fail_on in texts:
+            raise RuntimeError(f"cannot cut {self.fail_on}")
+        self.cut_texts.extend(texts)
+        return [list(text) for text in texts]
+
+
+def _expected(lines):
+    return "\n".join(" ".join(line.strip()) for line in lines if line.strip())
+
+
+def _cut_file(tmp_path, lines, engine=None, **kwargs) -> str:
+    input_path, output_path = tmp_path / 'in.txt', tmp_path / 'out.txt'
+    input_path.write_text("\n".join(lines), encoding='utf-8')
+    (engine or CharEngine()).cut_file(str(input_path), str(output_path), **kwargs)
+    return output_path.read_text(encoding='utf-8')
+
+
+@pytest.mark.parametrize('batch_size', [1, 3, 1000])
+def test_cut_file_matches_line_by_line_across_batches(tmp_path, batch_size):
+    lines = [f"  第{i}行文本 " if i % 7 else "" for i in range(2000)]
+    assert _cut_file(tmp_path, lines, batch_size=batch_size) == _expected(lines)
+
+
+def test_cut_file_single_batch_has_no_trailing_newline(tmp_path):
+    assert _cut_file(tmp_path, ["你好", "", "世界", ""]) == "你 好\n世 界"
+
+
+def test_cut_file_cuts_duplicate_lines_once(tmp_path):
+    lines = ["重复的行", "另一行", "重复的行"] * 500
+    engine = CharEngine()
+    assert _cut_file(tmp_path, lines, engine, batch_size=4) == _expected(lines)
+    assert sorted(engine.cut_texts) == ["另一行", "重复的行"]
+
+
+def test_cut_file_without_cache_dedupes_only_within_batches(tmp_path):
+    lines = ["重复的行", "另一行"] * 100
+    engine = CharEngine()
+    assert _cut_file(tmp_path, lines, engine, batch_size=2, cache_size=0) == _expected(lines)
+    assert len(engine.cut_texts) > 2
+    assert len(engine.cut_texts) <= len(lines)
+
+
+def test_cut_file_propagates_cut_errors(tmp_path):
+    lines = [f"第{i}行" for i in range(100)]
+    with pytest.raises(RuntimeError, match="第50行"):
+        _cut_file(tmp_path, lines, CharEngine(fail_on="第50行"), batch_size=1)
+
+
+def test_cut_file_propagates_reader_errors(tmp_path):
+    with pytest.raises(HanSegError):
+        CharEngine().cut_file(str(tmp_path / 'missing.txt'), str(tmp_path / 'out.txt'))
+    input_path = tmp_path / 'bad.txt'
+    input_path.write_bytes("好\n".encode('utf-8') * 100 + b"\xff\xfe\n")
+    with pytest.raises(UnicodeDecodeError):
+        CharEngine().cut_file(str(input_path), str(tmp_path / 'out.txt'), batch_size=1)
+
+
+def test_cut_file_propagates_writer_errors(tmp_path):
+    input_path = tmp_path / 'in.txt'
+    input_path.write_text("你好\n" * 100, encoding='utf-8')
+    with pytest.raises(OSError):
+        CharEngine()._cut_shard(str(input_path), str(tmp_path / 'missing' / 'out.txt'), _BatchTuner(1, 100, 1.0), _CutCache(10))
+
+
+def test_tuner_clamps_batch_size():
+    tuner = _BatchTuner(100, target_chars=10, target_latency=1.0)
+    tuner.update(lines=10, chars=10000, cut_chars=10000, elapsed=0.01)
+    assert tuner.batch_size == _BatchTuner.MIN_BATCH_SIZE
+
+    tuner = _BatchTuner(100, target_chars=10 ** 9, target_latency=1000.0)
+    tuner.update(lines=100, chars=100, cut_chars=100, elapsed=1e-6)
+    assert tuner.batch_size == _BatchTuner.MAX_BATCH_SIZE
+
+
+def test_tuner_follows_target_chars_and_latency():
+    tuner = _BatchTuner(100, target_chars=1000, target_latency=10.0)
+    tuner.update(lines=100, chars=1000, cut_chars=1000, elapsed=0.01)
+    assert tuner.batch_size == 100
+    tuner = _BatchTuner(100, target_chars=10 ** 6, target_latency=0.5)
+    tuner.update(lines=100, chars=1000, cut_chars=1000, elapsed=1.0)
+    assert tuner.batch_size == 50
+
+
+def test_tuner_rejects_invalid_settings():
+    with pytest.raises(HanSegError):
+        _BatchTuner(0, 100, 1.0)
+
+
+def test_cut_cache_is_bounded_lru():
+    cache = _CutCache(2)
+    a, b, c = (_CutCache.key(text) for text in "abc")
+    cache.put(a, "A")
+    cache.put(b, "B")
+    assert cache.get(a) == "A"
+    cache.put(c, "C")
+    assert cache.get(b) is None
+    assert cache.get(a) == "A" and cache.get(c) == "C"
+    disabled = _CutCache(0)
+    disabled.put(a, "A")
+    assert disabled.get(a) is None
@@ -0,0 +1,30 @@
+# test_converter.py
+
+import random
+import pytest
+from converter import T2SConverter, get_t2s_converter, pinyin_batch
+
+
+def test_single_characters_and_longest_phrase():
+    converter = T2SConverter({'著': '着', '土著': '土著', '體': '体', '繁體字': '繁体字', '們': '们'})
+    assert converter.convert('土著們穿著繁體字與體') == '土著们穿着繁体字與体'
+    assert converter.convert_batch(['我們', '']) == ['我们', '']
+
+
+def test_matches_snownlp_transfer():
+    zh = pytest.importorskip('snownlp.normal.zh')
+    converter = get_t2s_converter()
+    keys = list(zh.zh2hans)
+    alphabet = sorted({char for key in keys for char in key} | set('的是在中文abc 123，。'))
+    rng = random.Random(0)
+    for _ in range(2000):
+        parts = [rng.choice(keys) if rng.random() < 0.3 else rng.choice(alphabet) for _ in range(rng.randint(0, 12))]
+        text = ''.join(parts)
+        assert converter.convert(text) == zh.transfer(text), text
+    assert converter.convert('舒麥加') == zh.transfer('舒麥加')
+
+
+def test_pinyin_batch_matches_snownlp():
+    snownlp = pytest.importorskip('snownlp')
+    texts = ['中国人', '「繁體字」', '中国人']
+    assert pinyin_batch(texts) == [snownlp.SnowNLP(text).pinyin for text in texts]
@@ -0,0 +1,222 @@
+# test_deadline.py
+
+import threading
+import time
+import pytest
+from deadline import DaemonWorker, DeadlineRouter, EngineResult, LatencyModel, PROBE_TEXT
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_predict_needs_min_samples():
+    model = LatencyModel(min_samples=3)
+    model.observe('hanlp', 'cut', 10, 0.01)
+    model.observe('hanlp', 'cut', 20, 0.02)
+    assert model.predict('hanlp', 'cut', 30) is None
+    model.observe('hanlp', 'cut', 30, 0.03)
+    assert abs(model.predict('hanlp', 'cut', 40) - 0.04) < 1e-6
+
+
+def test_probe_is_rate_limited():
+    clock = FakeClock()
+    model = LatencyModel(probe_interval=1.0, clock=clock)
+    assert model.should_probe('hanlp', 'cut')
+    assert not model.should_probe('hanlp', 'cut')
+    assert model.should_probe('hanlp', 'pos')
+    clock.now = 1.0
+    assert model.should_probe('hanlp', 'cut')
+
+
+def test_probes_recover_from_a_predicted_miss():
+    """An engine trained at 0.04s which becomes instant is used again once the shadow probes have been observed."""
+    clock = FakeClock()
+    model = LatencyModel(probe_interval=1.0, clock=clock)
+    for _ in range(50):
+        model.observe('hanlp', 'cut', 10, 0.04)
+    timeout = 0.03
+    assert model.predict('hanlp', 'cut', 10) > timeout
+
+    probes = 0
+    for _ in range(100):
+        if model.predict('hanlp', 'cut', 10) <= timeout:
+            break
+        if model.should_probe('hanlp', 'cut'):
+            probes += 1
+            model.observe('hanlp', 'cut', 10, 0.0)
+        clock.now += 0.25
+    assert model.predict('hanlp', 'cut', 10) <= timeout
+    assert 0 < probes < 25
+
+
+def test_daemon_worker_runs_calls_in_order():
+    worker = DaemonWorker()
+    order = []
+    futures = [worker.submit(order.append, i) for i in range(5)]
+    for future in futures:
+        future.result(timeout=1)
+    assert order == [0, 1, 2, 3, 4]
+    assert worker._thread.daemon
+    worker.close()
+    worker._thread.join(timeout=1)
+    assert not worker._thread.is_alive()
+
+
+def test_daemon_worker_does_not_wait_for_a_hung_call():
+    worker = DaemonWorker()
+    release = threading.Event()
+    hung = worker.submit(release.wait)
+    queued = worker.submit(time.sleep, 0)
+    assert queued.cancel()
+    worker.close()
+    assert not hung.done()
+    release.set()
+    assert hung.result(timeout=1) is True
+
+
+def test_engine_result_is_a_list():
+    result = EngineResult([['a', 'b']], 'jieba')
+    assert result == [['a', 'b']]
+    assert result.engine == 'jieba'
+
+
+class SleepEngine:
+    """Stub engine taking seconds_per_char for each character, recording the texts and threads of its calls."""
+    def __init__(self, seconds_per_char: float = 0.0, tag: str = 'main'):
+        self.seconds_per_char = seconds_per_char
+        self.tag = tag
+        self.calls = []
+        self.threads = set()
+
+    def _work(self, text: str) -> None:
+        self.calls.append(text)
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.seconds_per_char * len(text))
+
+    def cut(self, texts, with_position=False):
+        for text in texts:
+            self._work(text)
+        return [iter(list(text)) for text in texts]
+
+    def pos(self, text):
+        self._work(text)
+        return [(text, self.tag)]
+
+
+def _router(main: SleepEngine, fallback: SleepEngine = None, **kwargs) -> DeadlineRouter:
+    return DeadlineRouter(main, 'main', fallback, 'fallback' if fallback else None, **kwargs)
+
+
+def _train(router: DeadlineRouter, lengths=(5, 10, 20, 40, 80)) -> None:
+    for n in lengths:
+        router.run('cut', n, None, ['字' * n])
+
+
+def test_untimed_calls_run_inline_without_worker():
+    main = SleepEngine()
+    router = _router(main)
+    result = router.run('cut', 2, None, ['你好'])
+    assert result == [['你', '好']] and result.engine == 'main'
+    assert main.threads == {threading.current_thread().name}
+    assert router._worker is None
+    with pytest.raises(ValueError):
+        router.run('cut', 2, 1.0, ['你好'])
+
+
+def test_timed_call_within_budget_uses_main_engine():
+    router = _router(SleepEngine(), SleepEngine(tag='fallback'))
+    result = router.run('pos', 2, 1.0, '你好')
+    assert result == [('你好', 'main')] and result.engine == 'main'
+    router.close()
+
+
+def test_expired_deadline_never_reaches_main_engine():
+    main = SleepEngine()
+    router = _router(main, SleepEngine(tag='fallback'))
+    result = router.run('pos', 2, -1.0, '你好')
+    assert result.engine == 'fallback'
+    assert main.calls == []
+    router.close()
+
+
+def test_overrun_falls_back_and_busy_worker_is_skipped():
+    main = SleepEngine(0.1)
+    router = _router(main, SleepEngine())
+    assert router.run('pos', 2, 0.02, '你好').engine == 'fallback'
+    assert router.busy()
+    assert router.run('pos', 1, 10.0, '好').engine == 'fallback'
+    assert main.calls == ['你好']
+    router._inflight.result(timeout=1)
+    assert router.run('pos', 1, 10.0, '好').engine == 'main'
+    router.close()
+
+
+def test_predicted_miss_falls_back_and_probes_with_a_short_sample():
+    main = SleepEngine(0.002)
+    router = _router(main, SleepEngine(), latency=LatencyModel(probe_interval=60.0))
+    _train(router)
+    main.calls.clear()
+    long_text = '字' * 300
+    result = router.run('cut', 300, 0.05, [long_text])
+    assert result.engine == 'fallback'
+    router._worker.submit(lambda: None).result(timeout=1)
+    assert main.calls == [PROBE_TEXT]
+    assert not router.busy()
+    assert router.run('cut', 300, 0.05, [long_text]).engine == 'fallback'
+    router._worker.submit(lambda: None).result(timeout=1)
+    assert main.calls == [PROBE_TEXT]
+    router.close()
+
+
+def test_near_miss_probes_with_the_call_itself():
+    main = SleepEngine(0.002)
+    router = _router(main, SleepEngine())
+    _train(router)
+    main.calls.clear()
+    text = '字' * 30
+    assert router.run('cut', 30, 0.04, [text]).engine == 'fallback'
+    router._worker.submit(lambda: None).result(timeout=1)
+    assert main.calls == [text]
+    router.close()
+
+
+def test_main_engine_recovers_after_speeding_up():
+    main = SleepEngine(0.004)
+    router = _router(main, SleepEngine(), latency=LatencyModel(probe_interval=0.02))
+    _train(router, [10] * 10)
+    timeout = 0.03
+    assert router.run('cut', 10, timeout, ['字' * 10]).engine == 'fallback'
+    main.seconds_per_char = 0.0
+    engines = []
+    for _ in range(60):
+        engines.append(router.run('cut', 10, timeout, ['字' * 10]).engine)
+        time.sleep(0.01)
+    assert engines[-10:] == ['main'] * 10
+    router.close()
+
+
+def test_long_texts_do_not_starve_short_ones():
+    """One slow text in every ten must not send the short texts which fit the budget to the fallback."""
+    main = SleepEngine(0.001)
+    router = _router(main, SleepEngine(), latency=LatencyModel(probe_interval=0.1))
+    _train(router)
+    short_on_main = short_total = 0
+    for i in range(100):
+        n = 300 if i % 10 == 0 else 10
+        result = router.run('cut', n, 0.05, ['字' * n])
+        if n == 10:
+            short_total += 1
+            short_on_main += result.engine == 'main'
+    assert short_on_main >= 0.9 * short_total
+    router.close()
+
+
+def test_cut_results_are_lists():
+    router = _router(SleepEngine())
+    result = router.run('cut', 2, None, ['你好'])
+    assert isinstance(result[0], list)
@@ -0,0 +1,103 @@
+# test_file_io.py
+
+import os
+import pytest
+from base import HanSegBase, HanSegError
+from file_io import expand_inputs, open_text, output_paths, add_compression_suffix, strip_compression_suffix
+
+
+class CharEngine(HanSegBase):
+    def __init__(self):
+        super().__init__('stub', False, None, False, None, {})
+
+    def cut(self, texts, with_position=False):
+        return [list(text) for text in texts]
+
+
+def _write(path, text: str) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open_text(str(path), 'w') as f:
+        f.write(text)
+    return str(path)
+
+
+@pytest.mark.parametrize('suffix', ['', '.gz', '.bz2', '.xz'])
+def test_open_text_round_trip(tmp_path, suffix):
+    path = _write(tmp_path / f"a.txt{suffix}", "你好\n世界\n")
+    with open_text(path) as f:
+        assert f.read() == "你好\n世界\n"
+
+
+def test_expand_inputs(tmp_path):
+    a = _write(tmp_path / 'corp' / 'a.txt', 'a')
+    b = _write(tmp_path / 'corp' / 'sub' / 'b.txt.gz', 'b')
+    _write(tmp_path / 'corp' / '.hidden', 'c')
+    assert expand_inputs(str(tmp_path / 'corp')) == [a, b]
+    assert expand_inputs(str(tmp_path / 'corp' / '**' / '*.gz')) == [b]
+    assert expand_inputs([b, str(tmp_path / 'corp')]) == [b, a]
+    with pytest.raises(HanSegError):
+        expand_inputs(str(tmp_path / 'missing.txt'))
+
+
+def test_compression_suffix():
+    assert add_compression_suffix('a.txt', 'gz') == 'a.txt.gz'
+    assert add_compression_suffix('a.txt.gz', 'gz') == 'a.txt.gz'
+    assert strip_compression_suffix('a.txt.xz') == 'a.txt'
+    with pytest.raises(HanSegError):
+        add_compression_suffix('a.txt', 'zip')
+
+
+def test_output_paths_keep_layout(tmp_path):
+    a = _write(tmp_path / 'corp' / 'a.txt.gz', 'a')
+    b = _write(tmp_path / 'corp' / 'sub' / 'b.txt', 'b')
+    out = str(tmp_path / 'out')
+    assert output_paths([a, b], out, 'xz') == [os.path.join(out, 'a.txt.xz'), os.path.join(out, 'sub', 'b.txt.xz')]
+    assert os.path.isdir(os.path.join(out, 'sub'))
+
+
+def test_output_paths_reject_collisions(tmp_path):
+    a = _write(tmp_path / 'corp' / 'a.txt', 'a')
+    b = _write(tmp_path / 'corp' / 'a.txt.gz', 'b')
+    with pytest.raises(HanSegError, match='both be written'):
+        output_paths([a, b], str(tmp_path / 'out'))
+    assert not os.path.exists(tmp_path / 'out')
+
+
+def test_output_paths_reject_overwriting_inputs(tmp_path):
+    a = _write(tmp_path / 'in' / 'a.txt', 'a')
+    b = _write(tmp_path / 'in' / 'b.txt', 'b')
+    with pytest.raises(HanSegError, match='overwrite the input'):
+        output_paths([a], a)
+    with pytest.raises(HanSegError, match='overwrite the input'):
+        output_paths([a], str(tmp_path / 'in'))
+    with pytest.raises(HanSegError, match='overwrite the input'):
+        output_paths([a, b], str(tmp_path / 'in'))
+
+
+def test_cut_file_does_not_destroy_its_input(tmp_path):
+    text = "".join(f"第{i}行\n" for i in range(1000))
+    a = _write(tmp_path / 'corp' / 'a.txt', text)
+    _write(tmp_path / 'corp' / 'b.txt', text)
+    engine = CharEngine()
+    with pytest.raises(HanSegError):
+        engine.cut_file(str(tmp_path / 'corp'), str(tmp_path / 'corp'))
+    with pytest.raises(HanSegError):
+        engine.cut_file(str(tmp_path / 'corp' / '*.txt'), str(tmp_path / 'corp'))
+    with pytest.raises(HanSegError):
+        engine.cut_file(a, a)
+    with open_text(a) as f:
+        assert f.read() == text
+
+
+def test_cut_file_and_words_count_on_compressed_shards(tmp_path):
+    _write(tmp_path / 'corp' / 'a.txt.gz', "你好\n\n世界\n")
+    _write(tmp_path / 'corp' / 'b.txt.bz2', "你好\n")
+    engine = CharEngine()
+    stats = engine.cut_file(str(tmp_path / 'corp'), str(tmp_path / 'out'), compress='xz')
+    assert [item['lines'] for item in stats] == [2, 1]
+    with open_text(str(tmp_path / 'out' / 'a.txt.xz')) as f:
+        assert f.read() == "你 好\n世 界"
+    engine.words_count(str(tmp_path / 'corp'), str(tmp_path / 'count.txt.gz'), workers=2)
+    with open_text(str(tmp_path / 'count.txt.gz')) as f:
+        counts = dict(line.split() for line in f)
+    assert counts == {'你': '2', '好': '2', '世': '1', '界': '1'}